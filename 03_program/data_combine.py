@@ -1,52 +1,64 @@
 import os
 import pandas as pd
 from itertools import product
+from data_loader import prefetch, prefetch_files
 
-def process_summary_data(folder_path, input_base_path):
+SUMMARY_COLUMNS = ['Variable', 'Mean', 'Standard Deviation', '95% CI Lower', '95% CI Upper', 'Year', 'Gender', 'Strategy']
 
-    data_list = []
+def parse_summary_filename(filename):
+    parts = filename.split('_')
+    year = parts[1]
+    gender = parts[2]
+    strategy = '_'.join(parts[3:]).replace('.csv', '')
+    return year, gender, strategy
 
-    for filename in os.listdir(folder_path):
+def list_summary_files(folder_path, strategies=None):
+    csv_meta = {}
+    for filename in sorted(os.listdir(folder_path)):
         if filename.endswith(".csv"):
-            parts = filename.split('_')
-            year = parts[1]
-            gender = parts[2]
-            strategy = parts[3].replace('.csv', '')
+            year, gender, strategy = parse_summary_filename(filename)
+            if strategies is not None and strategy not in strategies:
+                continue
+            csv_meta[os.path.join(folder_path, filename)] = (year, gender, strategy)
+    return csv_meta
+
+def process_summary_data(folder_path, input_base_path, strategies=['Base', 'Intervention'], queue_depth=4, executor='process'):
+
+    data_list = []
+
+    csv_meta = list_summary_files(folder_path, strategies)
 
-            file_path = os.path.join(folder_path, filename)
-            df = pd.read_csv(file_path)
+    for file_path, df in prefetch(csv_meta, pd.read_csv, queue_depth=queue_depth, executor='thread'):
+        year, gender, strategy = csv_meta[file_path]
 
-            df['Year'] = year
-            df['Gender'] = gender
-            df['Strategy'] = strategy
+        df['Year'] = year
+        df['Gender'] = gender
+        df['Strategy'] = strategy
 
-            data_list.append(df)
+        data_list.append(df)
 
     data_all = pd.concat(data_list, ignore_index=True)
 
-    col_names = ['Variable', 'Mean', 'Standard Deviation', '95% CI Lower', '95% CI Upper', 'Year', 'Gender', 'Strategy']
-    data_t = data_all[col_names]
+    data_t = data_all[SUMMARY_COLUMNS]
 
 
     data_stats = []
 
     years = ['10 years', '20 years', '30 years', '40 years', 'lifetime']
     genders = ['female', 'male', 'both']
-    strategies = ['Base', 'Intervention']
 
     combinations = product(years, genders, strategies)
+    stats_meta = {f'{input_base_path}/{year}/{gender}/{strategy}_statistics.xlsx': (year, gender, strategy)
+                  for year, gender, strategy in combinations}
 
-    for year, gender, strategy in combinations:
-        input_file_path = f'{input_base_path}/{year}/{gender}/{strategy}_statistics.xlsx'
-
-        if os.path.exists(input_file_path):
-            df = pd.read_excel(input_file_path, skiprows=2)
+    for input_file_path, df in prefetch_files(stats_meta, queue_depth=queue_depth, executor=executor):
+        year, gender, strategy = stats_meta[input_file_path]
 
-            df['Year'] = year
-            df['Gender'] = gender
-            df['Strategy'] = strategy
+        df['Year'] = year
+        df['Gender'] = gender
+        df['Strategy'] = strategy
 
-            data_stats.append(df)
+        data_stats.append(df)
 
     data_stats = pd.concat(data_stats, ignore_index=True)
     data_stats = data_stats.drop_duplicates()
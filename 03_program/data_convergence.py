@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from data_shared import attach_trials
+
+CONVERGENCE_VARIABLES = ['Cost', 'QALY', 't_stroke_event', 't_stroke_death', 't_chd_event', 't_chd_death',
+                         't_noncvd_death']
+# Death indicators are 0/1 per trial and get Wilson intervals, as in process_data.
+WILSON_VARIABLES = ['t_stroke_death', 't_chd_death', 't_noncvd_death']
+
+def running_stats(values, alpha=0.05, ci='normal'):
+    # Running mean and 95% CI half-width after each trial, from cumulative sums.
+    values = np.asarray(values, dtype=float)
+    n = np.arange(1, len(values) + 1)
+    z = stats.norm.ppf(1 - alpha / 2)
+    shift = values.mean() if len(values) else 0.0
+    centered = values - shift
+    cum = np.cumsum(centered)
+    cum_sq = np.cumsum(centered * centered)
+    mean = cum / n + shift
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = (cum_sq - cum * cum / n) / (n - 1)
+        if ci == 'wilson':
+            p = np.clip(mean, 0, 1)
+            half_width = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        else:
+            half_width = z * np.sqrt(np.maximum(var, 0) / n)
+    return pd.DataFrame({'Trials': n, 'Mean': mean, 'Half Width': half_width})
+
+def running_icer(delta_cost, delta_qaly, alpha=0.05):
+    # Running ICER with a delta-method CI half-width from cumulative sums of the paired differences.
+    delta_cost = np.asarray(delta_cost, dtype=float)
+    delta_qaly = np.asarray(delta_qaly, dtype=float)
+    n = np.arange(1, len(delta_cost) + 1)
+    z = stats.norm.ppf(1 - alpha / 2)
+    mean_c = np.cumsum(delta_cost) / n
+    mean_e = np.cumsum(delta_qaly) / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_c = (np.cumsum(delta_cost * delta_cost) - n * mean_c * mean_c) / (n - 1)
+        var_e = (np.cumsum(delta_qaly * delta_qaly) - n * mean_e * mean_e) / (n - 1)
+        cov = (np.cumsum(delta_cost * delta_qaly) - n * mean_c * mean_e) / (n - 1)
+        icer = mean_c / mean_e
+        var_icer = (var_c + icer * icer * var_e - 2 * icer * cov) / (mean_e * mean_e * n)
+        half_width = z * np.sqrt(np.maximum(var_icer, 0))
+    return pd.DataFrame({'Trials': n, 'Mean': icer, 'Half Width': half_width})
+
+def batch_means_se(values, n_batches=None):
+    values = np.asarray(values, dtype=float)
+    n_batches = n_batches or max(2, int(np.sqrt(len(values))))
+    batch_size = len(values) // n_batches
+    if batch_size < 1:
+        return np.nan
+    cum = np.concatenate([[0.0], np.cumsum(values[:batch_size * n_batches])])
+    batch_means = np.diff(cum[::batch_size]) / batch_size
+    return batch_means.std(ddof=1) / np.sqrt(n_batches)
+
+def required_trials(running, target, relative=True):
+    # Smallest trial count from which the CI half-width stays within the target precision.
+    precision = running['Half Width'].to_numpy()
+    if relative:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = precision / np.abs(running['Mean'].to_numpy())
+    met = precision <= target
+    if not met[-1]:
+        return np.nan
+    violated = np.flatnonzero(~met)
+    return int(running['Trials'].iloc[violated[-1] + 1]) if len(violated) else int(running['Trials'].iloc[0])
+
+def projected_trials(running, target, relative=True):
+    # CLT extrapolation from the final half-width: it shrinks with 1 / sqrt(trials).
+    last = running.iloc[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = last['Half Width'] / abs(last['Mean']) if relative else last['Half Width']
+    if not np.isfinite(precision):
+        return np.nan
+    return int(np.ceil(last['Trials'] * (precision / target) ** 2))
+
+def thin_running(running, n_points=200):
+    index = np.unique(np.geomspace(1, len(running), n_points).astype(int)) - 1
+    return running.iloc[index].reset_index(drop=True)
+
+def convergence_summary(running, values, target, relative):
+    last = running.iloc[-1]
+    return {
+        'Trials': int(last['Trials']),
+        'Mean': last['Mean'],
+        'MCSE (batch means)': batch_means_se(values),
+        '95% CI Half Width': last['Half Width'],
+        'Trials Needed': required_trials(running, target, relative),
+        'Trials Needed (projected)': projected_trials(running, target, relative)
+    }
+
+def convergence_diagnostics(cells, strategies=['Base', 'Intervention'], variables=CONVERGENCE_VARIABLES,
+                            target=0.05, relative=True, n_points=200):
+    # cells: {(year, gender, strategy): trial DataFrame or TrialHandle}. Returns the per-cell report
+    # and thinned running curves for plotting; ICERs compare every strategy with strategies[0].
+    report = []
+    curves = []
+    trials = {}
+    for (year, gender, strategy), df in cells.items():
+        df = attach_trials(df)
+        if 'Iteration' in df.columns:
+            df = df.sort_values('Iteration', kind='stable')
+        trials[(year, gender, strategy)] = df
+
+        for variable in variables:
+            values = df[variable].to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            running = running_stats(values, ci='wilson' if variable in WILSON_VARIABLES else 'normal')
+            report.append({'Year': year, 'Gender': gender, 'Strategy': strategy, 'Variable': variable,
+                           **convergence_summary(running, values, target, relative)})
+            curve = thin_running(running, n_points)
+            curve[['Year', 'Gender', 'Strategy', 'Variable']] = [year, gender, strategy, variable]
+            curves.append(curve)
+
+    reference = strategies[0]
+    for (year, gender, strategy), df in trials.items():
+        if strategy == reference or (year, gender, reference) not in trials:
+            continue
+        base = trials[(year, gender, reference)]
+        # Trials are paired across strategies by Iteration (common random numbers).
+        if 'Iteration' in df.columns and 'Iteration' in base.columns:
+            _, index, base_index = np.intersect1d(df['Iteration'].to_numpy(), base['Iteration'].to_numpy(),
+                                                  return_indices=True)
+        else:
+            index = base_index = np.arange(min(len(df), len(base)))
+        delta_cost = df['Cost'].to_numpy(dtype=float)[index] - base['Cost'].to_numpy(dtype=float)[base_index]
+        delta_qaly = df['QALY'].to_numpy(dtype=float)[index] - base['QALY'].to_numpy(dtype=float)[base_index]
+        running = running_icer(delta_cost, delta_qaly)
+        # Batch means on the linearised ICER contributions give its Monte Carlo standard error.
+        icer = running['Mean'].iloc[-1]
+        linearised = (delta_cost - icer * delta_qaly) / delta_qaly.mean()
+        summary = convergence_summary(running, linearised, target, relative)
+        report.append({'Year': year, 'Gender': gender, 'Strategy': strategy, 'Variable': 'ICER', **summary})
+        curve = thin_running(running, n_points)
+        curve[['Year', 'Gender', 'Strategy', 'Variable']] = [year, gender, strategy, 'ICER']
+        curves.append(curve)
+
+    return pd.DataFrame(report), pd.concat(curves, ignore_index=True)
@@ -0,0 +1,100 @@
+import re
+import numpy as np
+import pandas as pd
+
+NON_DOMINATED = 0
+STRONGLY_DOMINATED = 1
+EXTENDEDLY_DOMINATED = 2
+STATUS_LABELS = {
+    NON_DOMINATED: 'Non-dominated',
+    STRONGLY_DOMINATED: 'Dominated',
+    EXTENDEDLY_DOMINATED: 'Extendedly dominated'
+}
+
+def read_psa_strategies(psa_data, cost_prefix='Cost', effect_prefix='QALY'):
+    # TreeAge PSA exports hold one 'Cost (<strategy>)' / 'QALY (<strategy>)' column pair per strategy.
+    pattern = re.compile(rf'^{re.escape(cost_prefix)} \((.+)\)$')
+    strategies = [m.group(1) for m in map(pattern.match, psa_data.columns) if m]
+    costs = psa_data[[f'{cost_prefix} ({s})' for s in strategies]].to_numpy(dtype=float)
+    effects = psa_data[[f'{effect_prefix} ({s})' for s in strategies]].to_numpy(dtype=float)
+    return strategies, costs, effects
+
+def previous_remaining(remaining):
+    n = remaining.shape[1]
+    index = np.where(remaining, np.arange(n), -1)
+    index = np.maximum.accumulate(index, axis=1)
+    return np.concatenate([np.full((len(remaining), 1), -1), index[:, :-1]], axis=1)
+
+def next_remaining(remaining):
+    n = remaining.shape[1]
+    index = np.where(remaining, np.arange(n), n)
+    index = np.minimum.accumulate(index[:, ::-1], axis=1)[:, ::-1]
+    return np.concatenate([index[:, 1:], np.full((len(remaining), 1), n)], axis=1)
+
+def incremental_analysis(costs, effects):
+    # costs, effects: (iterations x strategies). Returns ICERs and dominance status in the input order.
+    costs = np.atleast_2d(np.asarray(costs, dtype=float))
+    effects = np.atleast_2d(np.asarray(effects, dtype=float))
+    n_iter, n_strat = costs.shape
+    rows = np.arange(n_iter)[:, None]
+
+    order = np.lexsort((-effects, costs), axis=1)
+    c = costs[rows, order]
+    e = effects[rows, order]
+
+    # Strong dominance: a strategy is dominated if a cheaper (or equal cost) one is at least as effective.
+    best_before = np.maximum.accumulate(e, axis=1)
+    best_before = np.concatenate([np.full((n_iter, 1), -np.inf), best_before[:, :-1]], axis=1)
+    status = np.where(e <= best_before, STRONGLY_DOMINATED, NON_DOMINATED)
+
+    # Extended dominance: drop every frontier point whose ICER exceeds the next one, until stable.
+    remaining = status == NON_DOMINATED
+    c_pad = np.concatenate([c, np.full((n_iter, 1), np.nan)], axis=1)
+    e_pad = np.concatenate([e, np.full((n_iter, 1), np.nan)], axis=1)
+    while True:
+        prev = previous_remaining(remaining)
+        nxt = next_remaining(remaining)
+        prev_safe = np.where(prev < 0, n_strat, prev)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            icer = (c - c_pad[rows, prev_safe]) / (e - e_pad[rows, prev_safe])
+            icer_next = (c_pad[rows, nxt] - c) / (e_pad[rows, nxt] - e)
+        extended = remaining & (prev >= 0) & (icer > icer_next)
+        if not extended.any():
+            break
+        status[extended] = EXTENDEDLY_DOMINATED
+        remaining &= ~extended
+
+    icer = np.where(remaining & (prev >= 0), icer, np.nan)
+
+    inverse = np.argsort(order, axis=1)
+    return icer[rows, inverse], status[rows, inverse]
+
+def probability_optimal(costs, effects, wtp_values, strategies):
+    costs = np.asarray(costs, dtype=float)
+    effects = np.asarray(effects, dtype=float)
+    wtp_values = np.asarray(wtp_values, dtype=float)
+    nmb = effects[:, :, None] * wtp_values[None, None, :] - costs[:, :, None]
+    optimal = nmb.argmax(axis=1)
+    probability = (optimal[:, None, :] == np.arange(costs.shape[1])[None, :, None]).mean(axis=0)
+    result = pd.DataFrame(probability.T, columns=strategies)
+    result.insert(0, 'WTP', wtp_values)
+    return result
+
+def summarize_incremental(costs, effects, strategies):
+    costs = np.asarray(costs, dtype=float)
+    effects = np.asarray(effects, dtype=float)
+    mean_cost = costs.mean(axis=0)
+    mean_effect = effects.mean(axis=0)
+    icer, status = incremental_analysis(mean_cost[None, :], mean_effect[None, :])
+    _, psa_status = incremental_analysis(costs, effects)
+
+    summary = pd.DataFrame({
+        'Strategy': strategies,
+        'Cost': mean_cost,
+        'QALY': mean_effect,
+        'ICER': icer[0],
+        'Status': [STATUS_LABELS[s] for s in status[0]]
+    })
+    for code, label in STATUS_LABELS.items():
+        summary[f'P({label})'] = (psa_status == code).mean(axis=0)
+    return summary.sort_values('Cost').reset_index(drop=True)
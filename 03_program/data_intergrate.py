@@ -77,10 +77,11 @@ def calculate_all_variables(data_pivot, data_t, population, years, genders, stra
 
     results = []
     df_plot_data = []
+    reference = strategies[0]
 
-    for year, gender, variable in product(years, genders, variables):
-        base_mean, base_ci_lower, base_ci_upper = get_values(year, gender, variable, 'Base')
-        intervention_mean, intervention_ci_lower, intervention_ci_upper = get_values(year, gender, variable, 'Intervention')
+    for year, gender, variable, strategy in product(years, genders, variables, strategies[1:]):
+        base_mean, base_ci_lower, base_ci_upper = get_values(year, gender, variable, reference)
+        intervention_mean, intervention_ci_lower, intervention_ci_upper = get_values(year, gender, variable, strategy)
 
         mean_diff = intervention_mean - base_mean
         ci_lower_diff = intervention_ci_lower - base_ci_lower
@@ -132,6 +133,8 @@ def calculate_all_variables(data_pivot, data_t, population, years, genders, stra
             df_plot_data.append({
                 'Year': year,
                 'Gender': gender,
+                'Strategy': strategy,
+                'Reference': reference,
                 'Variable': variable,
                 'Change_mean': change_mean_converted,
                 'Change_ci_lower': change_ci_lower_converted,
@@ -142,6 +145,7 @@ def calculate_all_variables(data_pivot, data_t, population, years, genders, stra
             results.append({
                 'Year': year,
                 'Gender': gender,
+                'Strategy': strategy,
                 'Variable': variable,
                 'Base': base_combined,
                 'Intervention': intervention_combined,
@@ -158,6 +162,8 @@ def calculate_all_variables(data_pivot, data_t, population, years, genders, stra
             df_plot_data.append({
                 'Year': year,
                 'Gender': gender,
+                'Strategy': strategy,
+                'Reference': reference,
                 'Variable': variable,
                 'Change_mean': change_mean,
                 'Change_ci_lower': change_ci_lower,
@@ -168,6 +174,7 @@ def calculate_all_variables(data_pivot, data_t, population, years, genders, stra
             results.append({
                 'Year': year,
                 'Gender': gender,
+                'Strategy': strategy,
                 'Variable': variable,
                 'Base': base_combined,
                 'Intervention': intervention_combined,
@@ -0,0 +1,84 @@
+import os
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+def read_workbook(path):
+    return pd.read_excel(path, skiprows=2)
+
+def result_nbytes(result):
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    return 0
+
+def prefetch(items, loader=read_workbook, queue_depth=4, max_workers=None, memory_cap=None, executor='process'):
+    # Yield (item, loader(item)) in input order while up to queue_depth later items load in the background.
+    # Workbook parsing is pure Python (openpyxl), so the default uses processes to get past the GIL.
+    # memory_cap is a soft cap. The result handed to the caller, finished loads and loads still in flight
+    # all count against it: the first two by their measured size, loads in flight by the largest result
+    # measured so far. A new load only starts when that estimate fits under the cap, or when nothing else
+    # is pending, so a workbook larger than every earlier one can still push usage past the cap.
+    items = list(items)
+    if max_workers is None:
+        max_workers = max(1, min(queue_depth, os.cpu_count() or 1))
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+
+    with pool_class(max_workers=max_workers) as pool:
+        pending = deque()
+        next_index = 0
+        reserved = {}
+        measured = set()
+        buffered = 0
+        estimate = None
+
+        def settle():
+            # Replace the reservation of each newly finished load with its measured size, once.
+            nonlocal buffered, estimate
+            for _, future in pending:
+                if future in measured or not future.done():
+                    continue
+                measured.add(future)
+                size = result_nbytes(future.result()) if future.exception() is None else 0
+                buffered += size - reserved[future]
+                reserved[future] = size
+                estimate = max(estimate or 0, size)
+
+        def top_up():
+            nonlocal next_index, buffered
+            if memory_cap is not None:
+                settle()
+            while next_index < len(items) and len(pending) < queue_depth:
+                if memory_cap is not None and pending:
+                    if estimate is None or buffered + estimate > memory_cap:
+                        break
+                future = pool.submit(loader, items[next_index])
+                reserved[future] = estimate or 0
+                buffered += reserved[future]
+                pending.append((items[next_index], future))
+                next_index += 1
+
+        try:
+            top_up()
+            while pending:
+                item, future = pending.popleft()
+                result = future.result()
+                if memory_cap is not None and future not in measured:
+                    size = result_nbytes(result)
+                    buffered += size - reserved[future]
+                    reserved[future] = size
+                    estimate = max(estimate or 0, size)
+                measured.discard(future)
+                # The result stays counted until the caller asks for the next one.
+                held = reserved.pop(future)
+                top_up()
+                yield item, result
+                buffered -= held
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+def prefetch_files(paths, loader=read_workbook, **kwargs):
+    return prefetch([path for path in paths if os.path.exists(path)], loader, **kwargs)
@@ -4,6 +4,20 @@ import numpy as np
 import scipy.stats as stats
 from itertools import product
 from statsmodels.stats.proportion import proportion_confint
+from stroke_type import (CAUSES, MEASURES, load_stroke_type_table, stroke_type_shares,
+                         sample_stroke_type_shares, allocate_stroke_type)
+from data_shared import attach_trials
+from executor import ProcessExecutor
+
+DEATH_COLUMNS = ['t_stroke_death', 't_IS_death', 't_HS_death', 't_US_death', 't_chd_death', 't_noncvd_death']
+EVENT_COLUMNS = ['t_stroke_event', 't_IS_event', 't_HS_event', 't_US_event', 't_chd_event']
+COST_COLUMNS = ['Cost', 'QALY']
+DEATH_ANNUAL_COLUMNS = ['t_stroke_death_annual', 't_IS_death_annual', 't_HS_death_annual', 't_US_death_annual',
+                        't_chd_death_annual', 't_noncvd_death_annual']
+EVENT_ANNUAL_COLUMNS = ['t_stroke_event_annual', 't_IS_event_annual', 't_HS_event_annual', 't_US_event_annual',
+                        't_chd_event_annual']
+COST_ANNUAL_COLUMNS = ['t_Cost_annual', 't_QALY_annual']
+AGE_COLUMNS = ['t_stroke_deathage', 't_chd_deathage', 't_noncvd_deathage', 't_deathage', 't_timeperiod']
 
 def compute_and_append_stats(data, ci_func, summary_dict):
     for column in data.columns:
@@ -82,22 +96,7 @@ def bootstrap_ci(data, alpha=0.05, n_bootstrap=10000):
     ci_upper = np.percentile(bootstrap_means, 100 * (1 - alpha / 2))
     return ci_lower, ci_upper
 
-def process_data(input_file_path_alldata, summary_dict, gender, strategy, year):
-    summary_dict = {
-        'Variable': [],
-        'Mean': [],
-        'Standard Deviation': [],
-        '95% CI Lower': [],
-        '95% CI Upper': [],
-        '2.5%': [],
-        '10%': [],
-        'Median': [],
-        '90%': [],
-        '97.5%': [],
-        'Min': [],
-        'Max': []
-    }
-
+def prepare_data(input_file_path_alldata, year, stroke_type_path=None, stroke_type_draws=0, seed=None):
     year_mapping = {
         '10 years': 10,
         '20 years': 20,
@@ -106,7 +105,10 @@ def process_data(input_file_path_alldata, summary_dict, gender, strategy, year):
         'lifetime': 100
     }
 
-    df = pd.read_excel(input_file_path_alldata, skiprows=2)
+    if isinstance(input_file_path_alldata, pd.DataFrame):
+        df = input_file_path_alldata
+    else:
+        df = pd.read_excel(input_file_path_alldata, skiprows=2)
     df_cleaned = df.dropna(subset=['t_stroke_deathage', 't_chd_deathage', 't_noncvd_deathage', 't_initial_age',
                                    't_stroke_death', 't_chd_death', 't_noncvd_death', 
                                    't_stroke_event', 't_chd_event', 'distStrokeType',
@@ -127,12 +129,33 @@ def process_data(input_file_path_alldata, summary_dict, gender, strategy, year):
     HS_ratio = value_percentages[2]
     US_ratio = value_percentages[3]
 
-    df_cleaned['t_IS_event'] = df_cleaned['t_stroke_event'] * IS_ratio
-    df_cleaned['t_HS_event'] = df_cleaned['t_stroke_event'] * HS_ratio
-    df_cleaned['t_US_event'] = df_cleaned['t_stroke_event'] * US_ratio
-    df_cleaned['t_IS_death'] = df_cleaned['t_stroke_death'] * IS_ratio
-    df_cleaned['t_HS_death'] = df_cleaned['t_stroke_death'] * HS_ratio
-    df_cleaned['t_US_death'] = df_cleaned['t_stroke_death'] * US_ratio
+    if stroke_type_path:
+        # GBD splits the determined strokes by age and sex; the undetermined share stays the model's.
+        table, age_edges = load_stroke_type_table(stroke_type_path)
+        if stroke_type_draws:
+            # One generator for the draws and for each trial's draw index, so the two never share bits.
+            rng = np.random.default_rng(seed)
+            shares = sample_stroke_type_shares(table, stroke_type_draws, rng=rng)
+            draw_index = rng.integers(stroke_type_draws, size=len(df_cleaned))
+        else:
+            shares = stroke_type_shares(table)
+            draw_index = None
+        allocation = allocate_stroke_type(df_cleaned['t_sex'].to_numpy(), df_cleaned['t_initial_age'].to_numpy(),
+                                          shares, age_edges, US_ratio, draw_index)
+        stroke_event = df_cleaned['t_stroke_event'].to_numpy()[:, None]
+        stroke_death = df_cleaned['t_stroke_death'].to_numpy()[:, None]
+        event_alloc = stroke_event * allocation[:, :, MEASURES.index('event')]
+        death_alloc = stroke_death * allocation[:, :, MEASURES.index('death')]
+        for i, cause in enumerate(CAUSES):
+            df_cleaned[f't_{cause}_event'] = event_alloc[:, i]
+            df_cleaned[f't_{cause}_death'] = death_alloc[:, i]
+    else:
+        df_cleaned['t_IS_event'] = df_cleaned['t_stroke_event'] * IS_ratio
+        df_cleaned['t_HS_event'] = df_cleaned['t_stroke_event'] * HS_ratio
+        df_cleaned['t_US_event'] = df_cleaned['t_stroke_event'] * US_ratio
+        df_cleaned['t_IS_death'] = df_cleaned['t_stroke_death'] * IS_ratio
+        df_cleaned['t_HS_death'] = df_cleaned['t_stroke_death'] * HS_ratio
+        df_cleaned['t_US_death'] = df_cleaned['t_stroke_death'] * US_ratio
 
     df_cleaned['t_stroke_event_annual'] = df_cleaned['t_stroke_event'] / df_cleaned['t_timeperiod']
     df_cleaned['t_stroke_death_annual'] = df_cleaned['t_stroke_death'] / df_cleaned['t_timeperiod']
@@ -148,28 +171,44 @@ def process_data(input_file_path_alldata, summary_dict, gender, strategy, year):
     df_cleaned['t_Cost_annual'] = df_cleaned['Cost'] / df_cleaned['t_timeperiod']
     df_cleaned['t_QALY_annual'] = df_cleaned['QALY'] / df_cleaned['t_timeperiod']
 
+    return df_cleaned
 
-    data_death = df_cleaned[['t_stroke_death', 't_IS_death', 't_HS_death', 't_US_death', 't_chd_death', 't_noncvd_death']].copy()
+def summarize_trials(df_cleaned):
+    df_cleaned = attach_trials(df_cleaned)
+    summary_dict = {
+        'Variable': [],
+        'Mean': [],
+        'Standard Deviation': [],
+        '95% CI Lower': [],
+        '95% CI Upper': [],
+        '2.5%': [],
+        '10%': [],
+        'Median': [],
+        '90%': [],
+        '97.5%': [],
+        'Min': [],
+        'Max': []
+    }
+
+    data_death = df_cleaned[DEATH_COLUMNS].copy()
     compute_and_append_stats(data_death, compute_wilson_ci, summary_dict)
 
-    data_event = df_cleaned[['t_stroke_event', 't_IS_event', 't_HS_event', 't_US_event', 't_chd_event']].copy()
+    data_event = df_cleaned[EVENT_COLUMNS].copy()
     compute_and_append_stats(data_event, bootstrap_ci, summary_dict)
 
-    data_cost = df_cleaned[['Cost', 'QALY']].copy()
+    data_cost = df_cleaned[COST_COLUMNS].copy()
     compute_and_append_stats(data_cost, normal_ci, summary_dict)
 
-    data_death_annual = df_cleaned[['t_stroke_death_annual', 't_IS_death_annual', 't_HS_death_annual', 't_US_death_annual', 
-                                't_chd_death_annual', 't_noncvd_death_annual']].copy()
+    data_death_annual = df_cleaned[DEATH_ANNUAL_COLUMNS].copy()
     compute_and_append_stats(data_death_annual, compute_wilson_ci, summary_dict)
 
-    data_event_annual = df_cleaned[['t_stroke_event_annual', 't_IS_event_annual', 't_HS_event_annual', 't_US_event_annual', 
-                                't_chd_event_annual']].copy()
+    data_event_annual = df_cleaned[EVENT_ANNUAL_COLUMNS].copy()
     compute_and_append_stats(data_event_annual, bootstrap_ci, summary_dict)
 
-    data_cost_annual = df_cleaned[['t_Cost_annual', 't_QALY_annual']].copy()
+    data_cost_annual = df_cleaned[COST_ANNUAL_COLUMNS].copy()
     compute_and_append_stats(data_cost_annual, normal_ci, summary_dict)
 
-    data_age = df_cleaned[['t_stroke_deathage', 't_chd_deathage', 't_noncvd_deathage', 't_deathage', 't_timeperiod']].copy()
+    data_age = df_cleaned[AGE_COLUMNS].copy()
 
 
     for column in data_age.columns:
@@ -178,8 +217,20 @@ def process_data(input_file_path_alldata, summary_dict, gender, strategy, year):
         compute_and_append_stats(data_age_filtered, normal_ci, summary_dict)
 
 
-    # print(f"The statistics of {gender} in {strategy} during {year}.")
-
     return summary_dict
 
+def summarize_cells(handles, max_workers=None, executor=None):
+    # handles: {cell key: TrialHandle}. Workers attach to the shared trial arrays instead of unpickling them,
+    # and reseed the global RNG so bootstrap draws differ between forked workers.
+    if executor is None:
+        executor = ProcessExecutor(max_workers=max_workers, initializer=np.random.seed)
+    return dict(zip(handles, executor.map(summarize_trials, list(handles.values()))))
+
+def process_data(input_file_path_alldata, summary_dict, gender, strategy, year,
+                 stroke_type_path=None, stroke_type_draws=0, seed=None):
+    df_cleaned = prepare_data(input_file_path_alldata, year, stroke_type_path=stroke_type_path,
+                              stroke_type_draws=stroke_type_draws, seed=seed)
+
+    # print(f"The statistics of {gender} in {strategy} during {year}.")
 
+    return summarize_trials(df_cleaned)
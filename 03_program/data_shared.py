@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+TRIAL_PREFIXES = ('Iteration', 'Cost', 'QALY', 't_', 'dist')
+
+# Picklable description of one cell's trial columns; workers attach to it instead of receiving the data.
+TrialHandle = namedtuple('TrialHandle', ['backend', 'name', 'n_rows', 'columns'])
+
+# Segments already mapped in this process, so repeated tasks in a pool worker reuse the mapping.
+_attached = {}
+# Detached mappings that still backed live arrays; closed on a later detach once those arrays are gone.
+_lingering = []
+
+def trial_columns(df, prefixes=TRIAL_PREFIXES):
+    return [col for col in df.columns
+            if str(col).startswith(prefixes) and pd.api.types.is_numeric_dtype(df[col])]
+
+def close_segment(segment):
+    try:
+        segment.close()
+        return True
+    except BufferError:
+        return False
+
+def detach(names):
+    # Close this process's mappings of the given segments. attach_block holds a buffer export, so a
+    # mapping that still backs a live array refuses to close; it is retried on the next detach.
+    _lingering[:] = [segment for segment in _lingering if not close_segment(segment)]
+    for name in names:
+        segment = _attached.pop(name, None)
+        if segment is not None and not close_segment(segment):
+            _lingering.append(segment)
+
+def release_segments(names, directory):
+    detach(names)
+    for name in names:
+        try:
+            segment = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        segment.close()
+        segment.unlink()
+    if directory is not None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+class TrialArrayStore:
+    # Owns one (columns x trials) float64 block per cell in shared memory ('shm') or in
+    # memory-mapped .npy files ('memmap'). Blocks, and this process's own attachments to them,
+    # are released on close(), when the store is garbage collected, or at interpreter exit;
+    # shm segments left by a crashed parent are removed by the multiprocessing resource tracker.
+
+    def __init__(self, backend='shm', directory=None):
+        if backend not in ('shm', 'memmap'):
+            raise ValueError(f"Unknown backend '{backend}', expected 'shm' or 'memmap'.")
+        self.backend = backend
+        self.handles = {}
+        self._segments = {}
+        self._names = []
+        self.directory = tempfile.mkdtemp(prefix='trials_', dir=directory) if backend == 'memmap' else None
+        self._finalizer = weakref.finalize(self, release_segments, self._names, self.directory)
+
+    def put(self, key, df, columns=None):
+        if key in self.handles:
+            raise KeyError(f'{key} is already stored.')
+        columns = list(columns) if columns is not None else trial_columns(df)
+        n_rows = len(df)
+        shape = (len(columns), n_rows)
+
+        if self.backend == 'shm':
+            segment = shared_memory.SharedMemory(create=True, size=max(1, 8 * len(columns) * n_rows))
+            self._names.append(segment.name)
+            self._segments[segment.name] = segment
+            block = np.ndarray(shape, dtype=np.float64, buffer=segment.buf)
+            name = segment.name
+        else:
+            name = os.path.join(self.directory, f'{len(self.handles)}.npy')
+            block = np.lib.format.open_memmap(name, mode='w+', dtype=np.float64, shape=shape)
+
+        for i, col in enumerate(columns):
+            block[i] = df[col].to_numpy(dtype=np.float64)
+        if self.backend == 'memmap':
+            block.flush()
+        del block
+
+        handle = TrialHandle(self.backend, name, n_rows, tuple(columns))
+        self.handles[key] = handle
+        return handle
+
+    def __getitem__(self, key):
+        return self.handles[key]
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def attach_block(handle):
+    shape = (len(handle.columns), handle.n_rows)
+    if handle.backend == 'memmap':
+        return np.load(handle.name, mmap_mode='r')
+    if handle.name not in _attached:
+        _attached[handle.name] = shared_memory.SharedMemory(name=handle.name)
+    # frombuffer keeps a buffer export on the mapping, so it cannot be unmapped under a live array.
+    block = np.frombuffer(_attached[handle.name].buf, dtype=np.float64, count=shape[0] * shape[1]).reshape(shape)
+    block.setflags(write=False)
+    return block
+
+def attach_trials(handle):
+    # Zero-copy, read-only DataFrame over the stored columns; new columns added by the caller are private.
+    if isinstance(handle, pd.DataFrame):
+        return handle
+    block = attach_block(handle)
+    return pd.DataFrame(block.T, columns=list(handle.columns), copy=False)
+
+def detach_all():
+    detach(list(_attached))
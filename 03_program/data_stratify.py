@@ -0,0 +1,250 @@
+import warnings
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from statsmodels.stats.proportion import proportion_confint
+from data_process import (DEATH_COLUMNS, EVENT_COLUMNS, COST_COLUMNS, DEATH_ANNUAL_COLUMNS,
+                          EVENT_ANNUAL_COLUMNS, COST_ANNUAL_COLUMNS, AGE_COLUMNS, prepare_data)
+from data_shared import attach_trials
+
+# Same variable groups and CI methods as process_data; age columns drop zero values.
+STAT_GROUPS = [
+    (DEATH_COLUMNS, 'wilson', False),
+    (EVENT_COLUMNS, 'bootstrap', False),
+    (COST_COLUMNS, 'normal', False),
+    (DEATH_ANNUAL_COLUMNS, 'wilson', False),
+    (EVENT_ANNUAL_COLUMNS, 'bootstrap', False),
+    (COST_ANNUAL_COLUMNS, 'normal', False),
+    (AGE_COLUMNS, 'normal', True)
+]
+
+SUBGROUPS = {
+    'overall': [],
+    'sex': ['t_sex'],
+    'age': ['age_band'],
+    'smoking': ['distSmoking'],
+    'diabetes': ['distDiabetes'],
+    'adherence': ['distAdherence']
+}
+
+AGE_BAND_EDGES = [35, 45, 55, 65, 75, 85]
+SEX_LABELS = {1: 'female', 2: 'male'}
+QUANTILES = [('2.5%', 0.025), ('10%', 0.1), ('Median', 0.5), ('90%', 0.9), ('97.5%', 0.975)]
+SUMMARY_COLUMNS = ['Variable', 'Mean', 'Standard Deviation', '95% CI Lower', '95% CI Upper',
+                   '2.5%', '10%', 'Median', '90%', '97.5%', 'Min', 'Max', 'Trials']
+
+def add_age_band(df, edges=AGE_BAND_EDGES):
+    edges = np.asarray(edges)
+    index = np.clip(np.searchsorted(edges, df['t_initial_age'].to_numpy(), side='right') - 1, 0, len(edges) - 1)
+    labels = [f'{lo}-{hi - 1}' for lo, hi in zip(edges[:-1], edges[1:])] + [f'{edges[-1]}+']
+    df['age_band'] = np.asarray(labels, dtype=object)[index]
+    return df
+
+def format_stratum(column, value):
+    if column == 't_sex':
+        return SEX_LABELS.get(int(value), str(value))
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+def build_strata(df, subgroups):
+    # Every row gets one code for the finest cell over all subgroup columns; membership[cell, stratum] = 1
+    # rolls fine-cell reductions up to each subgroup's strata without replicating rows per subgroup.
+    columns = list(dict.fromkeys(col for cols in subgroups.values() for col in cols))
+    uniques, inverses = [], []
+    for col in columns:
+        unique, inverse = np.unique(df[col].to_numpy(), return_inverse=True)
+        uniques.append(unique)
+        inverses.append(inverse.ravel())
+    shape = tuple(len(u) for u in uniques)
+    if columns:
+        present, fine_code = np.unique(np.ravel_multi_index(inverses, shape), return_inverse=True)
+        fine_index = dict(zip(columns, np.unravel_index(present, shape)))
+    else:
+        present, fine_code = np.zeros(1, dtype=np.intp), np.zeros(len(df), dtype=np.intp)
+        fine_index = {}
+    fine_code = fine_code.ravel()
+
+    labels = []
+    cell_strata = []
+    for name, cols in subgroups.items():
+        if not cols:
+            cell = np.zeros(len(present), dtype=np.intp)
+            cell_labels = [(name, 'both')]
+        else:
+            sub_shape = tuple(shape[columns.index(col)] for col in cols)
+            sub_present, cell = np.unique(np.ravel_multi_index([fine_index[col] for col in cols], sub_shape),
+                                          return_inverse=True)
+            cell_labels = []
+            for idx in zip(*np.unravel_index(sub_present, sub_shape)):
+                label = ', '.join(format_stratum(col, uniques[columns.index(col)][i]) for col, i in zip(cols, idx))
+                cell_labels.append((name, label))
+        cell_strata.append(cell.ravel() + len(labels))
+        labels.extend(cell_labels)
+
+    membership = np.zeros((len(present), len(labels)))
+    for cell in cell_strata:
+        membership[np.arange(len(present)), cell] = 1
+    return fine_code, np.array(cell_strata), membership, labels
+
+def segment_quantile(values, starts, counts, q):
+    pos = (counts - 1) * q
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, counts - 1)
+    frac = pos - lo
+    lo_val = values[starts + lo]
+    return lo_val + frac * (values[starts + hi] - lo_val)
+
+def stratified_bootstrap_ci(values, fine_code, membership, alpha, n_bootstrap, rng, chunk_size=2_000_000):
+    # values: (columns, trials). Each draw resamples all trials once and is shared by every column; the
+    # resampled sums are reduced over the fine cells and rolled up to every stratum, so the cost does
+    # not grow with the number of subgroups. Stratum sizes vary between draws, as in a plain bootstrap.
+    n_columns, n = values.shape
+    n_fine, n_strata = membership.shape
+    valid = ~np.isnan(values)
+    complete = valid.all(axis=1)
+    values = np.where(valid, values, 0.0)
+    batch = max(1, chunk_size // max(n, 1))
+    means = np.empty((n_columns, n_bootstrap, n_strata))
+    for b in range(0, n_bootstrap, batch):
+        size = min(batch, n_bootstrap - b)
+        idx = rng.integers(n, size=(size, n))
+        cell = (fine_code[idx] + n_fine * np.arange(size)[:, None]).ravel()
+        counts = np.bincount(cell, minlength=size * n_fine).reshape(size, n_fine) @ membership
+        for i in range(n_columns):
+            sums = np.bincount(cell, weights=values[i][idx].ravel(), minlength=size * n_fine)
+            sums = sums.reshape(size, n_fine) @ membership
+            if not complete[i]:
+                column_counts = np.bincount(cell, weights=valid[i][idx].ravel(), minlength=size * n_fine)
+                column_counts = column_counts.reshape(size, n_fine) @ membership
+            else:
+                column_counts = counts
+            with np.errstate(divide='ignore', invalid='ignore'):
+                means[i, b:b + size] = sums / column_counts
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        ci_lower = np.nanpercentile(means, 100 * alpha / 2, axis=1)
+        ci_upper = np.nanpercentile(means, 100 * (1 - alpha / 2), axis=1)
+    return ci_lower, ci_upper
+
+def stratified_column_stats(values, fine_code, cell_strata, membership, ci, alpha=0.05, bootstrap_ci=None):
+    # Sums are reduced once over the fine cells; quantiles come from one value sort per column followed
+    # by a stable (radix) sort on each subgroup's stratum codes.
+    n_strata = membership.shape[1]
+    result = {col: np.full(n_strata, np.nan) for col in SUMMARY_COLUMNS[1:]}
+    if len(values) == 0:
+        result['Trials'] = np.zeros(n_strata, dtype=int)
+        return result
+
+    n_fine = membership.shape[0]
+    shift = values.mean()
+    counts = np.bincount(fine_code, minlength=n_fine) @ membership
+    sums = np.bincount(fine_code, weights=values, minlength=n_fine) @ membership
+    centered = np.bincount(fine_code, weights=values - shift, minlength=n_fine) @ membership
+    squares = np.bincount(fine_code, weights=(values - shift) ** 2, minlength=n_fine) @ membership
+    present = counts > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sums / counts
+        var = np.maximum(squares - centered * centered / counts, 0) / (counts - 1)
+        std = np.where(counts > 1, np.sqrt(var), np.nan)
+
+    if ci == 'wilson':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ci_lower, ci_upper = proportion_confint(sums, counts, alpha=alpha, method='wilson')
+        ci_lower = np.where(sums == 0, np.nan, ci_lower)
+        ci_upper = np.where(sums == 0, np.nan, ci_upper)
+    elif ci == 'bootstrap':
+        ci_lower, ci_upper = bootstrap_ci
+    else:
+        z = stats.norm.ppf(1 - alpha / 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stderr = std / np.sqrt(counts)
+        ci_lower, ci_upper = mean - z * stderr, mean + z * stderr
+
+    result['Mean'][present] = mean[present]
+    result['Standard Deviation'][present] = std[present]
+    result['95% CI Lower'][present] = np.asarray(ci_lower)[present]
+    result['95% CI Upper'][present] = np.asarray(ci_upper)[present]
+
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    code_dtype = np.min_scalar_type(n_strata)
+    for strata in cell_strata:
+        codes = strata[fine_code[order]].astype(code_dtype)
+        if codes[0] == codes[-1] and (codes == codes[0]).all():
+            segment_values = sorted_values
+            seg_codes = codes[:1]
+            starts = np.zeros(1, dtype=np.intp)
+        else:
+            perm = np.argsort(codes, kind='stable')
+            codes = codes[perm]
+            segment_values = sorted_values[perm]
+            starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            seg_codes = codes[starts]
+        seg_counts = np.diff(np.r_[starts, len(segment_values)])
+        for col, q in QUANTILES:
+            result[col][seg_codes] = segment_quantile(segment_values, starts, seg_counts, q)
+        result['Min'][seg_codes] = segment_values[starts]
+        result['Max'][seg_codes] = segment_values[starts + seg_counts - 1]
+    result['Trials'] = counts.astype(int)
+    return result
+
+def compute_stratified_stats(df, subgroups=SUBGROUPS, alpha=0.05, n_bootstrap=10000, seed=None):
+    df = attach_trials(df)
+    if 'age_band' not in df.columns:
+        df = add_age_band(df.copy(deep=False))
+    fine_code, cell_strata, membership, labels = build_strata(df, subgroups)
+    rng = np.random.default_rng(seed)
+
+    bootstrap_columns = [col for columns, ci, _ in STAT_GROUPS if ci == 'bootstrap' for col in columns]
+    bootstrap_lower, bootstrap_upper = stratified_bootstrap_ci(
+        np.vstack([df[col].to_numpy(dtype=float) for col in bootstrap_columns]), fine_code, membership,
+        alpha, n_bootstrap, rng)
+
+    frames = []
+    for columns, ci, drop_zero in STAT_GROUPS:
+        for column in columns:
+            values = df[column].to_numpy(dtype=float)
+            valid = ~np.isnan(values)
+            if drop_zero:
+                valid &= values != 0
+            bootstrap = None
+            if ci == 'bootstrap':
+                i = bootstrap_columns.index(column)
+                bootstrap = bootstrap_lower[i], bootstrap_upper[i]
+            result = stratified_column_stats(values[valid], fine_code[valid], cell_strata, membership, ci,
+                                             alpha=alpha, bootstrap_ci=bootstrap)
+            frame = pd.DataFrame(result)
+            frame.insert(0, 'Variable', column)
+            frame.insert(0, 'Stratum', [label for _, label in labels])
+            frame.insert(0, 'Subgroup', [name for name, _ in labels])
+            frame['stratum_index'] = np.arange(len(labels))
+            frames.append(frame)
+
+    data = pd.concat(frames, ignore_index=True)
+    data = data.sort_values('stratum_index', kind='stable').drop(columns='stratum_index')
+    return data.reset_index(drop=True)
+
+def process_data_stratified(input_file_path_alldata, gender, strategy, year, subgroups=SUBGROUPS,
+                            stroke_type_path=None, n_bootstrap=10000, seed=None):
+    df_cleaned = prepare_data(input_file_path_alldata, year, stroke_type_path=stroke_type_path, seed=seed)
+    data = compute_stratified_stats(df_cleaned, subgroups=subgroups, n_bootstrap=n_bootstrap, seed=seed)
+    data['Year'] = year
+    data['Gender'] = gender
+    data['Strategy'] = strategy
+    return data
+
+def subgroup_summary(data_stratified, subgroup, population):
+    # Reshape one subgroup into the data_t layout used by calculate_all_variables and the plots, with each
+    # stratum in the Gender column, and return the matching population per stratum. Strata missing from
+    # population get the 'both' population times their share of the trials.
+    col_names = ['Variable', 'Mean', 'Standard Deviation', '95% CI Lower', '95% CI Upper', 'Year', 'Gender', 'Strategy']
+    data = data_stratified[data_stratified['Subgroup'].isin([subgroup, 'overall'])].copy()
+    data['Gender'] = data['Stratum']
+
+    trials = data[data['Variable'] == 'Cost'].groupby(['Year', 'Strategy', 'Gender'])['Trials'].sum()
+    shares = (trials / trials.xs('both', level='Gender')).groupby(level='Gender').mean()
+    stratum_population = {stratum: population[stratum] if stratum in population else population['both'] * share
+                          for stratum, share in shares.items()}
+    strata = ['both'] + [stratum for stratum in dict.fromkeys(data['Gender']) if stratum != 'both']
+    return data[col_names].reset_index(drop=True), {stratum: stratum_population[stratum] for stratum in strata}
@@ -0,0 +1,373 @@
+import os
+import sys
+import time
+import types
+import queue
+import pickle
+import marshal
+import hashlib
+import secrets
+import argparse
+import threading
+import traceback
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.managers import BaseManager
+
+# Digests of input files keyed by (path, size, mtime), so unchanged workbooks are hashed once.
+_file_digests = {}
+
+def file_digest(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+def content_token(value):
+    # File path arguments are addressed by the file contents, not the path string.
+    if isinstance(value, str) and os.path.isfile(value):
+        return ('file', file_digest(value))
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(content_token(v) for v in value)
+    if isinstance(value, dict):
+        return 'dict', tuple(sorted((k, content_token(v)) for k, v in value.items()))
+    return value
+
+def code_token(func):
+    # The function's bytecode plus the source of its module and of every module it reaches in the same
+    # directory, so editing a helper in data_process also changes the key of process_data_stratified.
+    code = getattr(func, '__code__', None)
+    token = [('code', hashlib.sha256(marshal.dumps(code)).hexdigest() if code is not None else None)]
+    module = sys.modules.get(func.__module__)
+    module_path = getattr(module, '__file__', None)
+    if not module_path:
+        return tuple(token)
+    directory = os.path.dirname(os.path.abspath(module_path))
+    seen = set()
+    stack = [module]
+    while stack:
+        module = stack.pop()
+        path = getattr(module, '__file__', None)
+        if module.__name__ in seen or not path or os.path.dirname(os.path.abspath(path)) != directory:
+            continue
+        seen.add(module.__name__)
+        token.append((module.__name__, file_digest(path)))
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                stack.append(value)
+            elif isinstance(getattr(value, '__module__', None), str) and value.__module__ in sys.modules:
+                stack.append(sys.modules[value.__module__])
+    return tuple(sorted(token, key=str))
+
+def task_key(func, args=(), kwargs=None):
+    kwargs = kwargs or {}
+    payload = (func.__module__, func.__qualname__, code_token(func), content_token(tuple(args)),
+               content_token(kwargs))
+    return hashlib.sha256(pickle.dumps(payload, protocol=4)).hexdigest()
+
+class ResultCache:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        with open(self.path(key), 'rb') as f:
+            return pickle.load(f)
+
+    def put(self, key, value):
+        tmp_path = f'{self.path(key)}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path(key))
+
+class Executor:
+    # Runs (func, args, kwargs) tasks and returns results in task order. Tasks whose content key is
+    # already in the cache are not run again; failed tasks are retried up to max_retries times, and
+    # tasks that have been running longer than task_timeout seconds get a duplicate attempt on an
+    # idle worker (first result wins).
+
+    def __init__(self, cache_dir=None, max_retries=2, task_timeout=None):
+        self.cache = ResultCache(cache_dir) if cache_dir else None
+        self.max_retries = max_retries
+        self.task_timeout = task_timeout
+
+    def run(self, tasks):
+        tasks = [(func, tuple(args), dict(kwargs or {})) for func, args, kwargs in tasks]
+        keys = [task_key(*task) for task in tasks]
+        results = {}
+        if self.cache is not None:
+            results = {key: self.cache.get(key) for key in set(keys) if key in self.cache}
+
+        pending = {}
+        for key, task in zip(keys, tasks):
+            if key not in results:
+                pending[key] = task
+        if pending:
+            for key, value in self.execute(pending):
+                results[key] = value
+                if self.cache is not None:
+                    self.cache.put(key, value)
+        return [results[key] for key in keys]
+
+    def map(self, func, *iterables, **kwargs):
+        return self.run([(func, args, kwargs) for args in zip(*iterables)])
+
+    def execute(self, pending):
+        raise NotImplementedError
+
+    def failed(self, key, error):
+        raise RuntimeError(f'Task {key[:12]} failed after {self.max_retries + 1} attempts:\n{error}')
+
+class SerialExecutor(Executor):
+    def execute(self, pending):
+        for key, (func, args, kwargs) in pending.items():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    yield key, func(*args, **kwargs)
+                    break
+                except Exception:
+                    error = traceback.format_exc()
+            else:
+                self.failed(key, error)
+
+class ProcessExecutor(Executor):
+    # Only max_workers tasks are submitted at a time, so a submitted task is running and its time since
+    # submission is its run time. A crashed worker breaks the pool: it is recreated and the tasks that
+    # were running are resubmitted while they have retries left.
+
+    def __init__(self, max_workers=None, initializer=None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_workers = max_workers
+        self.initializer = initializer
+
+    def execute(self, pending):
+        max_workers = self.max_workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=max_workers, initializer=self.initializer)
+        attempts = {key: 0 for key in pending}
+        errors = {}
+        started = {}
+        running = {}
+        queued = deque(pending)
+        outstanding = set(pending)
+
+        def submit(key):
+            func, args, kwargs = pending[key]
+            future = pool.submit(func, *args, **kwargs)
+            attempts[key] += 1
+            started[key] = time.monotonic()
+            running[future] = key
+
+        def retry(key, error):
+            errors[key] = error
+            if key not in outstanding or key in running.values() or key in queued:
+                return
+            if attempts[key] > self.max_retries:
+                self.failed(key, errors[key])
+            queued.appendleft(key)
+
+        try:
+            while outstanding:
+                broken = False
+                while queued and len(running) < max_workers and not broken:
+                    key = queued.popleft()
+                    try:
+                        submit(key)
+                    except BrokenProcessPool:
+                        queued.appendleft(key)
+                        broken = True
+                if self.task_timeout is not None and not queued and not broken:
+                    now = time.monotonic()
+                    for key in sorted(set(running.values()), key=started.get):
+                        if len(running) >= max_workers:
+                            break
+                        if now - started[key] > self.task_timeout and attempts[key] <= self.max_retries:
+                            submit(key)
+
+                if not broken:
+                    done, _ = wait(running, timeout=self.task_timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key = running.pop(future)
+                        if key not in outstanding:
+                            continue
+                        error = future.exception()
+                        if error is None:
+                            outstanding.discard(key)
+                            yield key, future.result()
+                        else:
+                            broken = broken or isinstance(error, BrokenProcessPool)
+                            retry(key, ''.join(traceback.format_exception(error)))
+
+                if broken:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=self.initializer)
+                    lost = [key for key in running.values() if key in outstanding]
+                    running.clear()
+                    for key in dict.fromkeys(lost):
+                        retry(key, 'Worker process terminated abruptly (BrokenProcessPool).')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+class QueueManager(BaseManager):
+    pass
+
+QueueManager.register('get_tasks')
+QueueManager.register('get_results')
+
+def run_worker(address, authkey, initializer=None):
+    # Worker loop for one node: pull pickled tasks from the coordinator, report when each one starts
+    # and push its result back.
+    manager = QueueManager(address=tuple(address), authkey=authkey)
+    manager.connect()
+    tasks = manager.get_tasks()
+    results = manager.get_results()
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            item = tasks.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        except (EOFError, ConnectionError, BrokenPipeError):
+            return
+        if item is None:
+            return
+        key, attempt, payload = item
+        results.put((key, attempt, 'started', None))
+        try:
+            func, args, kwargs = pickle.loads(payload)
+            results.put((key, attempt, 'done', pickle.dumps(func(*args, **kwargs), protocol=pickle.HIGHEST_PROTOCOL)))
+        except Exception:
+            results.put((key, attempt, 'failed', traceback.format_exc()))
+
+class TCPExecutor(Executor):
+    # Coordinator of a TCP work queue. Workers on any node run
+    #     python executor.py worker --host <coordinator> --port <port> --authkey <hex key>
+    # with this directory importable; start_local_workers() runs them as local processes instead.
+    # Tasks are pickled, so anyone holding the authkey can run code on the coordinator and the workers:
+    # the default binds to 127.0.0.1 only, and without an authkey a random one is generated and printed.
+
+    def __init__(self, host='127.0.0.1', port=0, authkey=None, poll_interval=0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        class CoordinatorManager(BaseManager):
+            pass
+
+        CoordinatorManager.register('get_tasks', callable=lambda: self.tasks)
+        CoordinatorManager.register('get_results', callable=lambda: self.results)
+        if authkey is None:
+            authkey = secrets.token_bytes(32)
+            print(f'TCPExecutor authkey for workers: --authkey {authkey.hex()}')
+        self.authkey = authkey
+        self.poll_interval = poll_interval
+        self.manager = CoordinatorManager(address=(host, port), authkey=authkey)
+        self.server = self.manager.get_server()
+        self.address = self.server.address
+        self.local_workers = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def start_local_workers(self, n_workers, initializer=None):
+        context = multiprocessing.get_context('spawn')
+        address = ('127.0.0.1', self.address[1])
+        for _ in range(n_workers):
+            process = context.Process(target=run_worker, args=(address, self.authkey, initializer), daemon=True)
+            process.start()
+            self.local_workers.append(process)
+        return self.local_workers
+
+    def execute(self, pending):
+        # Straggler time counts from the worker's 'started' message, and a duplicate is only queued when
+        # no other task is waiting, so tasks that are merely queued are never duplicated.
+        attempts = {key: 0 for key in pending}
+        started = {}
+
+        def dispatch(key):
+            attempts[key] += 1
+            started.pop(key, None)
+            self.tasks.put((key, attempts[key], pickle.dumps(pending[key], protocol=pickle.HIGHEST_PROTOCOL)))
+
+        outstanding = set(pending)
+        try:
+            for key in pending:
+                dispatch(key)
+            while outstanding:
+                try:
+                    key, attempt, status, payload = self.results.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    key = None
+                if key in outstanding:
+                    if status == 'started':
+                        if attempt == attempts[key]:
+                            started[key] = time.monotonic()
+                    elif status == 'done':
+                        outstanding.discard(key)
+                        yield key, pickle.loads(payload)
+                    elif attempt == attempts[key]:
+                        if attempts[key] > self.max_retries:
+                            self.failed(key, payload)
+                        dispatch(key)
+                if self.task_timeout is not None and self.tasks.empty():
+                    now = time.monotonic()
+                    for key in outstanding:
+                        if key in started and now - started[key] > self.task_timeout and attempts[key] <= self.max_retries:
+                            dispatch(key)
+                            break
+        finally:
+            self.drop_tasks(pending)
+
+    def drop_tasks(self, keys):
+        # Remove attempts of finished tasks that no worker has picked up yet.
+        kept = []
+        while True:
+            try:
+                item = self.tasks.get_nowait()
+            except queue.Empty:
+                break
+            if item is None or item[0] not in keys:
+                kept.append(item)
+        for item in kept:
+            self.tasks.put(item)
+
+    def close(self):
+        for _ in self.local_workers:
+            self.tasks.put(None)
+        for process in self.local_workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.local_workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def make_executor(backend='process', **kwargs):
+    executors = {'serial': SerialExecutor, 'process': ProcessExecutor, 'tcp': TCPExecutor}
+    if backend not in executors:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(executors)}.")
+    return executors[backend](**kwargs)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a worker node for a TCPExecutor coordinator.')
+    parser.add_argument('command', choices=['worker'])
+    parser.add_argument('--host', required=True)
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--authkey', required=True, help='Hex authkey printed by the coordinator.')
+    options = parser.parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    run_worker((options.host, options.port), bytes.fromhex(options.authkey))
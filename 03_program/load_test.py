@@ -0,0 +1,64 @@
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+from urllib.parse import quote
+from urllib.error import HTTPError
+
+DEFAULT_PATHS = [
+    '/summary?year=lifetime&gender=female&variable=t_IS_death',
+    '/summary?gender=both&strategy=Base',
+    '/change?year=lifetime&gender=female&variable=t_IS_death',
+    '/change?year=10 years,20 years&variable=Cost,QALY&abs=1',
+    '/change?gender=male&format=0',
+    '/figure/bar.pdf',
+    '/figure/line.pdf'
+]
+
+def timed_get(url):
+    # Error responses are recorded with their status code so the run continues and counts them.
+    start = time.perf_counter()
+    try:
+        with urlopen(url) as response:
+            response.read()
+            status = response.status
+    except HTTPError as e:
+        e.read()
+        status = e.code
+    return time.perf_counter() - start, status
+
+def run_load_test(base_url, paths=DEFAULT_PATHS, n_requests=1000, concurrency=8, warmup=True):
+    urls = [base_url.rstrip('/') + quote(path, safe='/?=&,') for path in paths]
+    if warmup:
+        for url in urls:
+            timed_get(url)
+
+    requests = [urls[i % len(urls)] for i in range(n_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed_get, requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    errors = sum(status != 200 for _, status in results)
+    return {
+        'requests': n_requests,
+        'errors': errors,
+        'throughput (req/s)': n_requests / elapsed,
+        'p50 (ms)': np.percentile(latencies, 50),
+        'p99 (ms)': np.percentile(latencies, 99),
+        'max (ms)': latencies.max()
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report p50/p99 latency of a running query_service.')
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--no-warmup', action='store_true')
+    options = parser.parse_args()
+    report = run_load_test(options.url, n_requests=options.requests, concurrency=options.concurrency,
+                           warmup=not options.no_warmup)
+    for name, value in report.items():
+        print(f'{name}: {round(value, 2)}')
@@ -1,7 +1,19 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
-def create_summary_plot_bar(df_plot, colors, output_pdf_path):
+def create_summary_plot_bar(df_plot, colors, output_pdf_path, strategy=None, reference=None):
+    if strategy is None and 'Strategy' in df_plot.columns:
+        strategies = df_plot['Strategy'].unique()
+        if len(strategies) > 1:
+            raise ValueError(f'df_plot has several strategies {list(strategies)}; pass strategy to pick one.')
+        strategy = strategies[0] if len(strategies) else None
+    if strategy is not None:
+        df_plot = df_plot[df_plot['Strategy'] == strategy]
+    # The strategy every change is measured against (strategies[0] in calculate_all_variables).
+    if reference is None:
+        references = df_plot['Reference'].unique() if 'Reference' in df_plot.columns else []
+        reference = references[0] if len(references) else 'Base'
+
     stroke_event_vars = ['t_IS_event', 't_HS_event', 't_US_event']
     stroke_death_vars = ['t_IS_death', 't_HS_death', 't_US_death']
     chd_vars = ['t_chd_event', 't_chd_death']
@@ -84,7 +96,7 @@ def create_summary_plot_bar(df_plot, colors, output_pdf_path):
             ax.set_title(f'{col_titles[col]} {row_titles[row]}', fontsize=18)
             
             if col == 0:
-                ax.set_ylabel('Change in (Intervention - Base), in thousands', fontsize=18)
+                ax.set_ylabel(f'Change in ({strategy or "Intervention"} - {reference}), in thousands', fontsize=18)
 
             ax.set_xticks(x_positions + (len(variables)-1)*bar_width/2)
             ax.set_xticklabels(all_years)
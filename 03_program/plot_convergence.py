@@ -0,0 +1,41 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+def create_convergence_plot(curves, year, gender, colors, output_pdf_path, num_cols=4):
+    plt.rcParams['font.family'] = 'Times New Roman'
+    plt.rcParams['font.size'] = 12
+
+    data = curves[(curves['Year'] == year) & (curves['Gender'] == gender)]
+    variables = list(dict.fromkeys(data['Variable']))
+    strategies = list(dict.fromkeys(data['Strategy']))
+
+    num_rows = int(np.ceil(len(variables) / num_cols))
+    fig, axs = plt.subplots(num_rows, num_cols, figsize=(4 * num_cols, 3 * num_rows), dpi=200, squeeze=False)
+
+    for ax, variable in zip(axs.flat, variables):
+        for i, strategy in enumerate(strategies):
+            subset = data[(data['Variable'] == variable) & (data['Strategy'] == strategy)]
+            if subset.empty:
+                continue
+            color = colors[i % len(colors)]
+            ax.plot(subset['Trials'], subset['Mean'], color=color, linewidth=1, label=strategy)
+            ax.fill_between(subset['Trials'], subset['Mean'] - subset['Half Width'],
+                            subset['Mean'] + subset['Half Width'], color=color, alpha=0.2, linewidth=0)
+            ax.axhline(subset['Mean'].iloc[-1], color=color, linestyle='dotted', linewidth=0.8)
+
+        ax.set_xscale('log')
+        ax.set_title(variable, fontsize=12)
+        ax.set_xlabel('Trials', fontsize=10)
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+
+    for ax in axs.flat[len(variables):]:
+        ax.set_visible(False)
+
+    handles, labels = axs.flat[0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc='upper right', fontsize=10)
+    fig.suptitle(f'Running means with 95% CI, {gender}, {year}', fontsize=14)
+
+    plt.tight_layout()
+    plt.savefig(output_pdf_path, format='pdf')
+    plt.show()
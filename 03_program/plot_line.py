@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+from itertools import product
 
 def plot_data(ax, gender, variable, strategy, data_t, population, 
             mean_col, lower_col, upper_col, marker, color, linestyle, variable_map, legends):
@@ -29,22 +30,11 @@ def plot_data(ax, gender, variable, strategy, data_t, population,
     
     return line, None
 
-def sort_key(label):
-    if 'Intervention' in label:
-        if 'ischemic' in label:
-            return (0, label)
-        else:
-            return (1, label)
-    elif 'Base' in label:
-        if 'ischemic' in label:
-            return (2, label)
-        else:
-            return (3, label)
-    else:
-        return (4, label)
-
-
-def create_summary_plot(data_t, population, colors, markers, linestyles, pdf_path):
+def sort_key(entry, strategies):
+    _, label, strategy = entry
+    return (-strategies.index(strategy), 'ischemic' not in label, label)
+
+def create_summary_plot(data_t, population, colors, markers, linestyles, pdf_path, strategies=['Base', 'Intervention']):
     plt.rcParams['font.family'] = 'Times New Roman'
     plt.rcParams['font.size'] = 18
 
@@ -52,7 +42,6 @@ def create_summary_plot(data_t, population, colors, markers, linestyles, pdf_pat
     death_variables = ['t_IS_death', 't_HS_death', 't_US_death']
     chd_event_variables = ['t_chd_event']
     chd_death_variables = ['t_chd_death']
-    strategies = ['Base', 'Intervention']
 
     variable_map = { 
         't_IS_event': 'ischemic stroke events',
@@ -89,24 +78,22 @@ def create_summary_plot(data_t, population, colors, markers, linestyles, pdf_pat
             ax = axs[i, j]
 
             legends = set()
-            legend_handles = []
-            legend_labels = []
+            legend_entries = []
             
-            for variable, strategy in zip(variables_to_plot * 2, strategies * len(variables_to_plot)):
-                marker = markers[strategies.index(strategy)]
-                linestyle = linestyles[strategies.index(strategy)]
+            for variable, strategy in product(variables_to_plot, strategies):
+                marker = markers[strategies.index(strategy) % len(markers)]
+                linestyle = linestyles[strategies.index(strategy) % len(linestyles)]
                 color = colors[(variables_to_plot.index(variable) + 
                                 strategies.index(strategy) * len(variables_to_plot)) % len(colors)]
 
                 if variable in ['t_chd_event', 't_chd_death']:
-                    color = colors[0] if strategy == 'Base' else colors[3]
+                    color = colors[(strategies.index(strategy) * 3) % len(colors)]
 
                 line, label = plot_data(ax, gender, variable, strategy, data_t, population, 'Mean', '95% CI Lower', 
                                 '95% CI Upper', marker, color, linestyle, variable_map, legends)
                 
                 if label:
-                    legend_handles.append(line)
-                    legend_labels.append(label)
+                    legend_entries.append((line, label, strategy))
 
             titles = [
                 "stroke events",
@@ -132,8 +119,8 @@ def create_summary_plot(data_t, population, colors, markers, linestyles, pdf_pat
             label_index += 1
 
             if j == 2:
-                sorted_handles_labels = sorted(zip(legend_handles, legend_labels), key=lambda x: sort_key(x[1]))
-                sorted_handles, sorted_labels = zip(*sorted_handles_labels)
+                sorted_entries = sorted(legend_entries, key=lambda x: sort_key(x, strategies))
+                sorted_handles, sorted_labels, _ = zip(*sorted_entries)
                 ax.legend(sorted_handles, sorted_labels, loc='upper left', bbox_to_anchor=(1, 1), fontsize=14)
 
     plt.tight_layout()
@@ -0,0 +1,273 @@
+import io
+import os
+import json
+import time
+import sys
+import argparse
+import threading
+import warnings
+import traceback
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+from data_combine import SUMMARY_COLUMNS, list_summary_files
+from data_intergrate import calculate_all_variables
+from plot_line import create_summary_plot
+from plot_bar import create_summary_plot_bar
+
+POPULATION = {'both': 24979035, 'female': 11906872, 'male': 13072163}
+YEARS = ['10 years', '20 years', '30 years', '40 years', 'lifetime']
+GENDERS = ['both', 'female', 'male']
+QUERY_FIELDS = {'year': 'Year', 'gender': 'Gender', 'strategy': 'Strategy', 'variable': 'Variable'}
+LINE_COLORS = ['#1F77B4', '#FF7F0E', '#2CA02C', '#1F77B4', '#FF7F0E', '#2CA02C']
+BAR_COLORS = ['#92A5D1', '#D9B9D4', '#C5DFE4', '#C9DCC4', '#7C9895']
+FIGURES = ['line', 'bar']
+
+class IndexedTable:
+    # Rows plus one inverted index per query field, so filters are set intersections instead of scans.
+
+    def __init__(self, df):
+        df = df.astype(object).where(df.notna(), None)
+        self.records = df.to_dict('records')
+        self.index = {}
+        for field, column in QUERY_FIELDS.items():
+            if column in df.columns:
+                postings = {}
+                for i, value in enumerate(df[column]):
+                    postings.setdefault(value, set()).add(i)
+                self.index[field] = postings
+
+    def query(self, filters):
+        ids = None
+        for field, values in filters.items():
+            if field not in self.index:
+                continue
+            matched = set().union(*(self.index[field].get(value, set()) for value in values))
+            ids = matched if ids is None else ids & matched
+        if ids is None:
+            return self.records
+        return [self.records[i] for i in sorted(ids)]
+
+class LRUCache:
+    # Least-recently-used cache bounded by the total size of the cached byte strings.
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                return None
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.items:
+                self.size -= len(self.items.pop(key))
+            self.items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.size = 0
+
+class ResultStore:
+    # In-memory copy of the summary outputs. refresh() re-reads only the summary CSVs whose
+    # modification time changed and drops the derived tables and figures built from the old data.
+
+    def __init__(self, folder_path, population=POPULATION, strategies=None, figure_cache_bytes=64 * 1024 ** 2):
+        self.folder_path = folder_path
+        self.population = population
+        self.strategies = strategies
+        self.files = {}
+        self.version = 0
+        self.refresh_error = None
+        self.lock = threading.RLock()
+        self.render_lock = threading.Lock()
+        self.figures = LRUCache(figure_cache_bytes)
+        self.refresh()
+
+    def refresh(self):
+        # The new file set is staged and swapped in only once every changed file has been read, so a
+        # failed refresh leaves the previous data in place and the next refresh sees the same changes.
+        csv_meta = list_summary_files(self.folder_path, self.strategies)
+        with self.lock:
+            files = dict(self.files)
+            changed = list(set(files) - set(csv_meta))
+            for file_path in changed:
+                del files[file_path]
+            for file_path, (year, gender, strategy) in csv_meta.items():
+                mtime = os.stat(file_path).st_mtime_ns
+                if file_path in files and files[file_path][0] == mtime:
+                    continue
+                df = pd.read_csv(file_path)
+                df['Year'] = year
+                df['Gender'] = gender
+                df['Strategy'] = strategy
+                files[file_path] = (mtime, df[SUMMARY_COLUMNS])
+                changed.append(file_path)
+            self.files = files
+            if changed or self.version == 0:
+                self.rebuild()
+        return changed
+
+    def rebuild(self):
+        frames = [df for _, df in self.files.values()]
+        self.data_t = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=SUMMARY_COLUMNS)
+        self.summary = IndexedTable(self.data_t)
+        self.changes = {}
+        self.version += 1
+        self.figures.clear()
+
+    def strategy_list(self):
+        strategies = list(dict.fromkeys(self.data_t['Strategy']))
+        if 'Base' in strategies:
+            strategies.remove('Base')
+            strategies.insert(0, 'Base')
+        return strategies
+
+    def change_tables(self, flag_abs, flag_format):
+        with self.lock:
+            key = (flag_abs, flag_format)
+            if key not in self.changes:
+                years = [year for year in YEARS if year in set(self.data_t['Year'])]
+                genders = [gender for gender in GENDERS if gender in set(self.data_t['Gender'])]
+                result_df, df_plot = calculate_all_variables(None, self.data_t, self.population, years, genders,
+                                                             self.strategy_list(), flag_abs, flag_format)
+                result_df = result_df.drop_duplicates().reset_index(drop=True)
+                df_plot = df_plot.drop_duplicates().reset_index(drop=True)
+                self.changes[key] = (IndexedTable(result_df), df_plot)
+            return self.changes[key]
+
+    def figure(self, name, params):
+        key = (self.version, name, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        cached = self.figures.get(key)
+        if cached is not None:
+            return cached
+
+        buffer = io.BytesIO()
+        with self.render_lock, warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            if name == 'line':
+                with self.lock:
+                    data_t = self.data_t
+                    strategies = self.strategy_list()
+                create_summary_plot(data_t, self.population, LINE_COLORS, ['x', 'o', 's', '^'], ['--', '-', ':', '-.'],
+                                    buffer, strategies)
+            elif name == 'bar':
+                _, df_plot = self.change_tables(False, False)
+                years = params.get('year', YEARS[:-1])
+                strategy = params.get('strategy', [self.strategy_list()[-1]])[0]
+                create_summary_plot_bar(df_plot[df_plot['Year'].isin(years)], BAR_COLORS, buffer, strategy)
+            else:
+                raise ValueError(f'Unknown figure {name}')
+            plt.close('all')
+
+        content = buffer.getvalue()
+        self.figures.put(key, content)
+        return content
+
+def parse_filters(query):
+    filters = {}
+    for field in QUERY_FIELDS:
+        if field in query:
+            filters[field] = [value for item in query[field] for value in item.split(',')]
+    return filters
+
+def parse_flag(query, name, default):
+    if name not in query:
+        return default
+    return query[name][0].lower() in ('1', 'true', 'yes')
+
+def make_handler(store):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def send_json(self, payload, status=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            try:
+                if url.path == '/health':
+                    self.send_json({'status': 'ok' if store.refresh_error is None else 'stale',
+                                    'version': store.version, 'files': len(store.files),
+                                    'figure_cache_bytes': store.figures.size, 'refresh_error': store.refresh_error})
+                elif url.path == '/reload':
+                    self.send_json({'changed': store.refresh(), 'version': store.version})
+                elif url.path == '/summary':
+                    self.send_json(store.summary.query(parse_filters(query)))
+                elif url.path == '/change':
+                    table, _ = store.change_tables(parse_flag(query, 'abs', False), parse_flag(query, 'format', True))
+                    self.send_json(table.query(parse_filters(query)))
+                elif url.path.startswith('/figure/'):
+                    name = os.path.splitext(url.path[len('/figure/'):])[0]
+                    if name not in FIGURES:
+                        self.send_json({'error': f'Unknown figure {name}'}, status=404)
+                        return
+                    content = store.figure(name, parse_filters(query))
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/pdf')
+                    self.send_header('Content-Length', str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                else:
+                    self.send_json({'error': f'Unknown path {url.path}'}, status=404)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            except Exception as e:
+                traceback.print_exc()
+                self.send_json({'error': f'{type(e).__name__}: {e}'}, status=500)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+def watch(store, interval):
+    # A CSV caught mid-write or removed mid-scan fails this tick only; the next tick retries it.
+    while True:
+        time.sleep(interval)
+        try:
+            store.refresh()
+            store.refresh_error = None
+        except Exception as e:
+            store.refresh_error = f'{type(e).__name__}: {e}'
+            print(f'Refresh of {store.folder_path} failed, retrying in {interval}s: {store.refresh_error}',
+                  file=sys.stderr)
+
+def serve(folder_path, host='127.0.0.1', port=8765, poll_interval=5.0, figure_cache_bytes=64 * 1024 ** 2):
+    store = ResultStore(folder_path, figure_cache_bytes=figure_cache_bytes)
+    if poll_interval:
+        threading.Thread(target=watch, args=(store, poll_interval), daemon=True).start()
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    print(f'Serving {len(store.files)} summary files on http://{host}:{server.server_address[1]}')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve summary results and figures over local HTTP/JSON.')
+    parser.add_argument('--summary', default='../02_output/summary')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--poll-interval', type=float, default=5.0)
+    parser.add_argument('--figure-cache-mb', type=float, default=64)
+    options = parser.parse_args()
+    serve(options.summary, options.host, options.port, options.poll_interval, int(options.figure_cache_mb * 1024 ** 2))
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+# t_sex in the TreeAge trials is 1 = female, 2 = male; GBD uses sex_id 2 = female, 1 = male.
+SEX_IDS = [2, 1]
+# GBD ischemic stroke, intracerebral haemorrhage and subarachnoid haemorrhage.
+CAUSE_IDS = [495, 496, 497]
+CAUSES = ['IS', 'HS', 'US']
+# GBD only reports determined strokes: IS is ischemic, HS is all haemorrhagic stroke (496 + 497).
+# US (undetermined) keeps the model's own share and GBD splits the remaining, determined share.
+DETERMINED_CAUSES = ['IS', 'HS']
+DETERMINED_CAUSE_IDS = [[495], [496, 497]]
+# Stroke events are allocated by GBD incidence, stroke deaths by GBD deaths.
+MEASURE_IDS = [6, 1]
+MEASURES = ['event', 'death']
+BOUNDS = ['val', 'lower', 'upper']
+Z_95 = 1.959963984540054
+
+def parse_age_band(age_name):
+    age_name = age_name.replace(' years', '')
+    if age_name.startswith('<'):
+        return 0
+    if age_name.endswith('+'):
+        return int(age_name[:-1])
+    return int(age_name.split('-')[0])
+
+@lru_cache(maxsize=None)
+def load_stroke_type_table(csv_path):
+    df = pd.read_csv(csv_path)
+    df = df[(df['metric_name'] == 'Number') & (df['age_name'] != 'All ages')
+            & df['sex_id'].isin(SEX_IDS) & df['cause_id'].isin(CAUSE_IDS) & df['measure_id'].isin(MEASURE_IDS)].copy()
+    df['age_lower'] = df['age_name'].map(parse_age_band)
+
+    age_edges = np.sort(df['age_lower'].unique())
+    index = pd.MultiIndex.from_product([SEX_IDS, age_edges, CAUSE_IDS, MEASURE_IDS],
+                                       names=['sex_id', 'age_lower', 'cause_id', 'measure_id'])
+    table = df.set_index(['sex_id', 'age_lower', 'cause_id', 'measure_id'])[BOUNDS].reindex(index)
+    table = table.to_numpy(dtype=float).reshape(len(SEX_IDS), len(age_edges), len(CAUSE_IDS), len(MEASURE_IDS), len(BOUNDS))
+    table = np.nan_to_num(table, nan=0.0)
+    table.setflags(write=False)
+    age_edges.setflags(write=False)
+    return table, age_edges
+
+def group_causes(counts, axis):
+    # Sum GBD causes into the determined model causes along the cause axis.
+    groups = [[CAUSE_IDS.index(cause_id) for cause_id in ids] for ids in DETERMINED_CAUSE_IDS]
+    return np.stack([counts.take(group, axis=axis).sum(axis=axis) for group in groups], axis=axis)
+
+def normalize_shares(counts, axis):
+    total = counts.sum(axis=axis, keepdims=True)
+    shares = np.full(counts.shape, 1 / counts.shape[axis])
+    np.divide(counts, total, out=shares, where=total > 0)
+    return shares
+
+def stroke_type_shares(table):
+    return normalize_shares(group_causes(table[..., BOUNDS.index('val')], axis=2), axis=2)
+
+def sample_stroke_type_shares(table, n_draws, seed=None, rng=None):
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    val = table[..., BOUNDS.index('val')]
+    sd = (table[..., BOUNDS.index('upper')] - table[..., BOUNDS.index('lower')]) / (2 * Z_95)
+    draws = rng.standard_normal((n_draws,) + val.shape, dtype=np.float64)
+    draws *= sd
+    draws += val
+    np.maximum(draws, 0, out=draws)
+    return normalize_shares(group_causes(draws, axis=3), axis=3)
+
+def allocate_stroke_type(t_sex, t_initial_age, shares, age_edges, undetermined_share=0.0, draw_index=None):
+    # Returns (trials, CAUSES, MEASURES) shares: IS/HS split the determined part, US is undetermined_share.
+    sex_index = np.asarray(t_sex, dtype=np.intp) - 1
+    age_index = np.searchsorted(age_edges, np.asarray(t_initial_age, dtype=float), side='right') - 1
+    np.clip(age_index, 0, len(age_edges) - 1, out=age_index)
+    if draw_index is None:
+        determined = shares[sex_index, age_index]
+    else:
+        determined = shares[np.asarray(draw_index, dtype=np.intp), sex_index, age_index]
+    undetermined = np.full((len(determined), 1, determined.shape[2]), undetermined_share)
+    return np.concatenate([determined * (1 - undetermined_share), undetermined], axis=1)